@@ -1,15 +1,87 @@
 from fastapi import APIRouter, HTTPException, Query, UploadFile, File
-from fastapi.responses import StreamingResponse
-from app.utils.forecasting import generate_forecast, normalize_columns
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from app.utils.forecasting import (
+    generate_forecast, generate_multi_forecast, normalize_columns, normalize_multi_columns
+)
+from typing import IO, Any, AsyncIterator, Callable, Dict, List
 import os
 import io
+import functools
+import aiofiles
+import anyio
+import orjson
 import pandas as pd
 
 router = APIRouter()
 
-# Data directory path
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-os.makedirs(DATA_DIR, exist_ok=True)
+FILE_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+async def iter_file(f: IO[bytes]) -> AsyncIterator[bytes]:
+    """
+    Yield a file's contents in chunks. Closing it is left to the response's background task.
+    """
+    while chunk := await anyio.to_thread.run_sync(f.read, FILE_CHUNK_SIZE):
+        yield chunk
+
+def to_records(df: pd.DataFrame) -> List[Dict]:
+    """
+    Convert a frame to JSON-ready records, with datetimes as ISO 8601 strings
+    (fractional seconds included when present, as FastAPI's encoder does).
+    """
+    datetime_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    if datetime_cols:
+        df = df.assign(**{c: df[c].map(pd.Timestamp.isoformat, na_action='ignore') for c in datetime_cols})
+    return df.to_dict(orient="records")
+
+def orjson_response(content: Any) -> Response:
+    """
+    Serialize with orjson, which handles numpy scalars natively and writes NaN as null.
+    """
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json"
+    )
+
+def _read_csv(source: bytes | str, **kwargs) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(source) if isinstance(source, bytes) else source, **kwargs)
+
+def _needs_c_engine(df: pd.DataFrame) -> bool:
+    """
+    pyarrow keeps duplicate header names as-is and converts offset timestamps to UTC,
+    losing the local wall time; the C engine handles both the way we expect.
+    """
+    return df.columns.duplicated().any() or any(
+        isinstance(dtype, pd.DatetimeTZDtype) for dtype in df.dtypes
+    )
+
+def _read_upload(source: bytes | str) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV from raw bytes or a saved path, retrying as latin1.
+    Uses the pyarrow engine, falling back to the C engine when pyarrow fails or
+    would change the data. Raises a 400 when the file cannot be parsed.
+    """
+    for encoding in ('utf-8', 'latin1'):
+        try:
+            df = _read_csv(source, engine='pyarrow', encoding=encoding)
+            if not _needs_c_engine(df):
+                return df
+        except Exception:
+            pass
+        try:
+            return _read_csv(source, encoding=encoding)
+        except Exception:
+            continue
+    raise HTTPException(status_code=400, detail="Invalid CSV file. Could not parse.")
+
+def _normalize_upload(normalize: Callable[[pd.DataFrame], Any], df: pd.DataFrame) -> Any:
+    """
+    Run a column normalizer, turning its detection errors into a 400.
+    """
+    try:
+        return normalize(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/forecast", tags=["Forecasting"])
 async def get_forecast(
@@ -19,39 +91,25 @@ async def get_forecast(
     growth: str = Query('linear', enum=['linear', 'flat']),
     daily_seasonality: str = 'auto',
     weekly_seasonality: str = 'auto',
-    yearly_seasonality: str = 'auto'
+    yearly_seasonality: str = 'auto',
+    intervals: bool = Query(True, description="Compute uncertainty intervals and anomalies")
 ):
     """
     Generate a forecast using the Prophet model based on uploaded CSV data.
     """
-    contents = await file.read()
-    
-    try:
-        df = pd.read_csv(io.BytesIO(contents))
-    except Exception:
-        try:
-            df = pd.read_csv(io.BytesIO(contents), encoding='latin1')
-        except Exception as e:
-            raise HTTPException(status_code=400, detail="Invalid CSV file. Could not parse.")
-
-    try:
-        df = normalize_columns(df)
-    except ValueError as e:
-         raise HTTPException(status_code=400, detail=str(e))
-
-    file_location = os.path.join(DATA_DIR, f"clean_{file.filename}")
-    df.to_csv(file_location, index=False)
+    df = _normalize_upload(normalize_columns, _read_upload(await file.read()))
 
     try:
         # Generate analysis (Forecast + Anomalies + Metrics)
         analysis_result = generate_forecast(
-            file_path=file_location,
+            file_path=df,
             days=days,
             seasonality_mode=seasonality_mode,
             growth=growth,
             daily_seasonality=daily_seasonality,
             weekly_seasonality=weekly_seasonality,
-            yearly_seasonality=yearly_seasonality
+            yearly_seasonality=yearly_seasonality,
+            include_intervals=intervals
         )
         
         forecast_df = analysis_result["forecast"]
@@ -59,10 +117,10 @@ async def get_forecast(
         metrics = analysis_result["metrics"]
         insights_data = analysis_result["insights"] # Structured dict
         
-        forecast_data = forecast_df.to_dict(orient="records")
-        anomalies_data = anomalies_df.to_dict(orient="records")
+        forecast_data = to_records(forecast_df)
+        anomalies_data = to_records(anomalies_df)
         
-        return {
+        return orjson_response({
             "message": f"Analysis complete. Forecasted {days} days.",
             "row_count": len(df),
             "parameters": {
@@ -74,7 +132,63 @@ async def get_forecast(
             "insights": insights_data.get("insights", []),
             "recommendations": insights_data.get("recommendations", []),
             "data": forecast_data
-        }
+        })
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecasting error: {str(e)}")
+
+@router.post("/forecast/multi", tags=["Forecasting"])
+async def get_multi_forecast(
+    file: UploadFile = File(...),
+    days: int = Query(30, description="Number of days to forecast"),
+    seasonality_mode: str = Query('additive', enum=['additive', 'multiplicative']),
+    growth: str = Query('linear', enum=['linear', 'flat']),
+    daily_seasonality: str = 'auto',
+    weekly_seasonality: str = 'auto',
+    yearly_seasonality: str = 'auto',
+    intervals: bool = Query(True, description="Compute uncertainty intervals and anomalies")
+):
+    """
+    Forecast every numeric column of the uploaded CSV in one request.
+    """
+    df, target_cols = _normalize_upload(normalize_multi_columns, _read_upload(await file.read()))
+
+    try:
+        # The fits block until every worker finishes, keep them off the event loop
+        results = await anyio.to_thread.run_sync(functools.partial(
+            generate_multi_forecast,
+            df,
+            target_cols,
+            days=days,
+            seasonality_mode=seasonality_mode,
+            growth=growth,
+            daily_seasonality=daily_seasonality,
+            weekly_seasonality=weekly_seasonality,
+            yearly_seasonality=yearly_seasonality,
+            include_intervals=intervals
+        ))
+        
+        targets = {}
+        for target, analysis_result in results.items():
+            insights_data = analysis_result["insights"]
+            targets[target] = {
+                "metrics": analysis_result["metrics"],
+                "anomalies": to_records(analysis_result["anomalies"]),
+                "insights": insights_data.get("insights", []),
+                "recommendations": insights_data.get("recommendations", []),
+                "data": to_records(analysis_result["forecast"])
+            }
+
+        return orjson_response({
+            "message": f"Analysis complete. Forecasted {days} days for {len(targets)} targets.",
+            "row_count": len(df),
+            "parameters": {
+                "seasonality_mode": seasonality_mode,
+                "growth": growth,
+            },
+            "targets": targets
+        })
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -95,17 +209,13 @@ async def get_forecast_report(
     """
     os.makedirs("data", exist_ok=True)
     file_location = os.path.join("data", file.filename)
-    with open(file_location, "wb") as f:
-        f.write(await file.read())
+    # Stream the upload to disk in chunks without blocking the event loop
+    async with aiofiles.open(file_location, "wb") as f:
+        while chunk := await file.read(FILE_CHUNK_SIZE):
+            await f.write(chunk)
 
     # 2. Read DataFrame and normalize
-    try:
-        df = pd.read_csv(file_location)
-        df = normalize_columns(df)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Invalid CSV file.")
+    df = _normalize_upload(normalize_columns, _read_upload(file_location))
 
     # 3. Generate Analysis
     try:
@@ -120,19 +230,23 @@ async def get_forecast_report(
         )
         
         # 4. Generate PDF
+        # doc.build is CPU bound, keep it off the event loop
         from app.utils.reporting import generate_pdf_report
-        pdf_buffer = generate_pdf_report(
+        pdf_file = await anyio.to_thread.run_sync(functools.partial(
+            generate_pdf_report,
             forecast_df=analysis_result["forecast"],
             metrics=analysis_result["metrics"],
             insights_data=analysis_result["insights"], # Fixed parameter name
             anomalies=analysis_result["anomalies"]
-        )
+        ))
         
         # 5. Return as Download
         return StreamingResponse(
-            pdf_buffer,
+            iter_file(pdf_file),
             media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=forecast_report.pdf"}
+            headers={"Content-Disposition": "attachment; filename=forecast_report.pdf"},
+            # Runs even if the client disconnects before the body starts streaming
+            background=BackgroundTask(pdf_file.close)
         )
 
     except ValueError as ve:
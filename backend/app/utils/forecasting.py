@@ -1,52 +1,79 @@
 import pandas as pd
 import numpy as np
-from prophet import Prophet
+from numba import njit
+from pandas.tseries.api import guess_datetime_format
+import copy
 import os
-from typing import Optional, Dict, List
+import threading
+import xxhash
+from cachetools import LRUCache
+from joblib import Parallel, delayed
+from typing import TYPE_CHECKING, Optional, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    # Prophet pulls in cmdstanpy and friends, so it is imported lazily at first use
+    from prophet import Prophet
+
+# Unfitted Prophet templates keyed by their constructor configuration.
+# Constructing Prophet loads the Stan backend every time, so we build each
+# configuration once and hand out deep copies per request. Bounded because the
+# seasonality params are free-form query strings.
+_PROPHET_CACHE: LRUCache = LRUCache(maxsize=16)
+_PROPHET_CACHE_LOCK = threading.Lock()
+
+# Fitted models and forecasts keyed by a hash of the input data and the forecast
+# params, so re-uploading the same CSV skips the Prophet fit entirely.
+_FORECAST_CACHE: LRUCache = LRUCache(maxsize=64)
+_FORECAST_CACHE_LOCK = threading.Lock()
+
+_DATE_CANDIDATES = ('ds', 'date', 'timestamp', 'time')
+_TARGET_CANDIDATES = ('y', 'value', 'sales', 'revenue', 'quantity', 'amount', 'close', 'price')
+# Rows inspected when falling back to dtype-based target detection
+_INFERENCE_SAMPLE_ROWS = 10_000
+
+# Upper bound on worker processes per multi-target request, so concurrent
+# requests do not each fan out to every core
+MAX_PARALLEL_FITS = 4
+
+def _check_unique_columns(df: pd.DataFrame) -> None:
+    duplicated = df.columns[df.columns.duplicated()]
+    if len(duplicated) > 0:
+        raise ValueError(f"Duplicate column names: {', '.join(map(str, duplicated.unique()))}.")
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardize column names to 'ds' and 'y' using smart detection.
     """
-    # Look for date column
-    date_col = None
-    if 'ds' in df.columns:
-        date_col = 'ds'
-    else:
-        for col in df.columns:
-            if col.lower() in ['date', 'ds', 'timestamp', 'time']:
-                date_col = col
-                break
-    
-    if not date_col:
-        raise ValueError("Could not detect a date column (looking for 'ds', 'date', 'timestamp').")
+    _check_unique_columns(df)
 
-    # Find the target value column
-    target_col = None
-    if 'y' in df.columns:
-        target_col = 'y'
+    # Early exit: already in Prophet's format
+    if 'ds' in df.columns and 'y' in df.columns:
+        date_col, target_col = 'ds', 'y'
     else:
-        potential_targets = [c for c in df.columns if c != date_col]
-        
-        # Check for explicit 'y' match first
-        for col in potential_targets:
-            if col.lower() == 'y':
-                target_col = col
-                break
-        
+        # Lowercased name -> original name, keeping the first column on collisions
+        low = {c.lower(): c for c in reversed(df.columns)}
+
+        # Look for date column
+        date_col = next((low[k] for k in _DATE_CANDIDATES if k in low), None)
+        if not date_col:
+            raise ValueError("Could not detect a date column (looking for 'ds', 'date', 'timestamp').")
+
+        # Find the target value column, explicit 'y' first then generic value names
+        low.pop(date_col.lower(), None)
+        target_col = next((low[k] for k in _TARGET_CANDIDATES if k in low), None)
+
+        # If still not found, pick the first numeric column that has data,
+        # inspecting a head (then tail) sample rather than the full frame
         if not target_col:
-            # Check for generic value names
-            common_names = ['value', 'sales', 'revenue', 'quantity', 'amount', 'close', 'price']
-            for col in potential_targets:
-                if col.lower() in common_names:
-                    target_col = col
-                    break
-            
-            # If still not found, pick the first numeric column
-            if not target_col:
-                numeric_cols = df[potential_targets].select_dtypes(include=['number', 'float', 'int']).columns
-                if len(numeric_cols) > 0:
-                    target_col = numeric_cols[0]
+            potential_targets = [c for c in df.columns if c != date_col]
+            sample = df.head(_INFERENCE_SAMPLE_ROWS)[potential_targets]
+            numeric_cols = sample.select_dtypes(include=['number']).columns
+            if len(numeric_cols) > 0:
+                tail = df.tail(_INFERENCE_SAMPLE_ROWS)
+                target_col = next(
+                    (c for c in numeric_cols if sample[c].notna().any() or tail[c].notna().any()),
+                    numeric_cols[0]
+                )
 
     if not target_col:
         raise ValueError("Could not detect a numeric target column. Please ensure one exists.")
@@ -60,24 +87,70 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     
     return df[['ds', 'y']]
 
+def normalize_multi_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Standardize the date column to 'ds' and keep every numeric column as a forecast target.
+    Returns the trimmed frame and the target column names.
+    """
+    _check_unique_columns(df)
+
+    low = {c.lower(): c for c in reversed(df.columns)}
+    date_col = next((low[k] for k in _DATE_CANDIDATES if k in low), None)
+    if not date_col:
+        raise ValueError("Could not detect a date column (looking for 'ds', 'date', 'timestamp').")
+
+    potential_targets = [c for c in df.columns if c != date_col]
+    sample = df.head(_INFERENCE_SAMPLE_ROWS)[potential_targets]
+    target_cols = list(sample.select_dtypes(include=['number']).columns)
+    if not target_cols:
+        raise ValueError("Could not detect a numeric target column. Please ensure one exists.")
+
+    df = df[[date_col, *target_cols]].rename(columns={date_col: 'ds'})
+    return df, target_cols
+
+# fastmath without 'nnan' so the NaN checks below are not optimized away
+@njit(fastmath={'reassoc', 'contract', 'arcp'}, cache=True)
+def _metrics_kernel(y_true: np.ndarray, y_pred: np.ndarray) -> Tuple[int, float, float, float]:
+    """
+    Single pass over both arrays accumulating MAE, RMSE and MAPE, skipping NaN pairs.
+    """
+    count = 0
+    sum_abs = 0.0
+    sum_sq = 0.0
+    sum_pct = 0.0
+    nonzero = 0
+    for i in range(y_true.shape[0]):
+        t = y_true[i]
+        p = y_pred[i]
+        if np.isnan(t) or np.isnan(p):
+            continue
+        err = t - p
+        abs_err = abs(err)
+        count += 1
+        sum_abs += abs_err
+        sum_sq += err * err
+        # Zero actuals contribute nothing to MAPE instead of an inf
+        nz = t != 0.0
+        sum_pct += abs(err / (t if nz else 1.0)) * nz
+        nonzero += nz
+
+    if count == 0:
+        return 0, 0.0, 0.0, 0.0
+
+    mae = sum_abs / count
+    rmse = np.sqrt(sum_sq / count)
+    mape = sum_pct / count * 100 if nonzero > 0 else 0.0
+    return count, mae, rmse, mape
+
 def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
-    # Remove NaNs if any
-    mask = ~np.isnan(y_true) & ~np.isnan(y_pred)
-    y_true = y_true[mask]
-    y_pred = y_pred[mask]
+    count, mae, rmse, mape = _metrics_kernel(
+        np.ascontiguousarray(y_true, dtype=np.float64),
+        np.ascontiguousarray(y_pred, dtype=np.float64)
+    )
     
-    if len(y_true) == 0:
+    if count == 0:
         return {"MAE": 0.0, "RMSE": 0.0, "MAPE": 0.0}
 
-    mae = np.mean(np.abs(y_true - y_pred))
-    rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-    
-    # Avoid division by zero for MAPE
-    with np.errstate(divide='ignore', invalid='ignore'):
-        mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
-        if np.isinf(mape) or np.isnan(mape):
-            mape = 0.0
-
     return {
         "MAE": round(mae, 4),
         "RMSE": round(rmse, 4),
@@ -85,32 +158,123 @@ def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float
     }
 
 def detect_anomalies(forecast: pd.DataFrame, actuals: pd.DataFrame) -> pd.DataFrame:
-    # Merge forecast with actuals
-    merged = pd.merge(actuals, forecast[['ds', 'yhat_lower', 'yhat_upper', 'yhat']], on='ds', how='inner')
+    # Align forecast to actuals on the (unique) ds index instead of a hash merge
+    fc = forecast.set_index('ds')[['yhat_lower', 'yhat_upper', 'yhat']]
+    merged = actuals.join(fc, on='ds', how='inner')
     
     # Identify anomalies
-    merged['is_anomaly'] = (merged['y'] < merged['yhat_lower']) | (merged['y'] > merged['yhat_upper'])
+    y = merged['y'].to_numpy()
+    is_anomaly = (y < merged['yhat_lower'].to_numpy()) | (y > merged['yhat_upper'].to_numpy())
     
     # Return only the rows that are anomalies
-    anomalies = merged[merged['is_anomaly']].copy()
+    anomalies = merged[is_anomaly].copy()
     
     if anomalies.empty:
         return pd.DataFrame(columns=['ds', 'y', 'yhat', 'yhat_lower', 'yhat_upper', 'severity', 'severity_level'])
 
-    # Calculate severity as percentage deviation from yhat
-    anomalies['severity_pct'] = (np.abs(anomalies['y'] - anomalies['yhat']) / anomalies['yhat']) * 100
-    
-    # Classify severity levels
-    def classify_severity(pct):
-        if pct > 20: return 'High'
-        if pct > 10: return 'Medium'
-        return 'Low'
+    # Calculate severity as absolute and percentage deviation from yhat
+    severity = np.abs(anomalies['y'].to_numpy() - anomalies['yhat'].to_numpy())
+    pct = severity / anomalies['yhat'].to_numpy() * 100
     
-    anomalies['severity_level'] = anomalies['severity_pct'].apply(classify_severity)
-    anomalies['severity'] = np.abs(anomalies['y'] - anomalies['yhat'])
+    # Classify severity levels in a single vectorized pass
+    anomalies['severity_pct'] = pct
+    anomalies['severity_level'] = np.select([pct > 20, pct > 10], ['High', 'Medium'], default='Low')
+    anomalies['severity'] = severity
     
     return anomalies[['ds', 'y', 'yhat', 'yhat_lower', 'yhat_upper', 'severity', 'severity_level']]
 
+def _parse_dates(ds: pd.Series) -> pd.Series:
+    """
+    Parse a date column using a format inferred from its first value, falling back
+    to generic per-cell parsing when no single format fits.
+    """
+    if pd.api.types.is_datetime64_any_dtype(ds):
+        parsed = ds
+    else:
+        first = ds.first_valid_index()
+        fmt = guess_datetime_format(str(ds[first])) if first is not None else None
+        parsed = None
+        if fmt is not None:
+            try:
+                parsed = pd.to_datetime(ds, format=fmt, cache=True)
+            except (ValueError, TypeError):
+                parsed = None
+        if parsed is None:
+            parsed = pd.to_datetime(ds, cache=True)
+
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_localize(None)
+
+    return parsed
+
+def _holidays_key(holidays: Optional[pd.DataFrame]) -> Optional[int]:
+    if holidays is None:
+        return None
+    return int(pd.util.hash_pandas_object(holidays, index=False).sum())
+
+def _data_key(df: pd.DataFrame) -> Tuple[int, int]:
+    y = df['y'].to_numpy()
+    if y.dtype == object:
+        # Object arrays hold pointers, hash the parsed values instead
+        y = pd.to_numeric(df['y']).to_numpy(dtype=np.float64, na_value=np.nan)
+    return (
+        xxhash.xxh3_64(df['ds'].to_numpy().tobytes()).intdigest(),
+        xxhash.xxh3_64(y.tobytes()).intdigest()
+    )
+
+def get_prophet_model(**params) -> 'Prophet':
+    """
+    Return a fresh, unfitted Prophet built from a cached template for these params.
+    """
+    from prophet import Prophet
+
+    holidays = params.get('holidays')
+    key = tuple(sorted((k, v) for k, v in params.items() if k != 'holidays')) + (_holidays_key(holidays),)
+
+    with _PROPHET_CACHE_LOCK:
+        template = _PROPHET_CACHE.get(key)
+    if template is None:
+        template = Prophet(**params)
+        with _PROPHET_CACHE_LOCK:
+            _PROPHET_CACHE[key] = template
+
+    # Prophet instances can only be fitted once, so every request gets its own copy
+    return copy.deepcopy(template)
+
+def _fit_forecast(
+    df: pd.DataFrame,
+    days: int,
+    include_intervals: bool,
+    **params
+) -> Tuple[pd.DataFrame, 'Prophet']:
+    """
+    Fit Prophet on df and return the trimmed, ds-sorted forecast with the fitted model.
+    """
+    # Initialize Prophet model
+    # Optimization: uncertainty_samples=100 (default 1000) to speed up forecast by ~10x while keeping intervals
+    m = get_prophet_model(
+        **params,
+        interval_width=0.95, # Increased for more conservative detection
+        uncertainty_samples=300 if include_intervals else 0 # More samples for more stable intervals
+    )
+    
+    m.fit(df)
+
+    # Create future dataframe (includes history + future)
+    future = m.make_future_dataframe(periods=days)
+
+    # Forecast
+    forecast = m.predict(future)
+    if not include_intervals:
+        # Prophet omits the interval columns when uncertainty_samples=0
+        forecast['yhat_lower'] = np.nan
+        forecast['yhat_upper'] = np.nan
+
+    # Trim Prophet's wide output to the columns we use and sort it once
+    forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].sort_values('ds', ignore_index=True)
+
+    return forecast, m
+
 def generate_forecast(
     file_path: str | pd.DataFrame,
     days: int = 30,
@@ -119,11 +283,18 @@ def generate_forecast(
     daily_seasonality: str = 'auto',
     weekly_seasonality: str = 'auto',
     yearly_seasonality: str = 'auto',
-    holidays: Optional[pd.DataFrame] = None
+    holidays: Optional[pd.DataFrame] = None,
+    include_intervals: bool = True
 ) -> Dict:
     """
     Loads data, trains Prophet, forecasts, detects anomalies, and calculates metrics.
     Returns a dictionary with 'forecast', 'anomalies', and 'metrics'.
+
+    With include_intervals=False the uncertainty simulation is skipped entirely:
+    yhat_lower/yhat_upper are returned as NaN and no anomalies are detected.
+
+    Fits are cached by data and params. The returned 'model' is shared with the
+    cache and with every caller that hits it, so treat it as read-only.
     """
     # Load data
     if isinstance(file_path, str):
@@ -151,41 +322,43 @@ def generate_forecast(
 
     # Convert ds to datetime and ensure consistency
     try:
-        df['ds'] = pd.to_datetime(df['ds'])
+        df['ds'] = _parse_dates(df['ds'])
         print(f"DEBUG: Processing {len(df)} data points from {df['ds'].min()} to {df['ds'].max()}")
     except Exception:
         raise ValueError("Could not parse 'ds' column as dates.")
-        
-    if df['ds'].dt.tz is not None:
-        df['ds'] = df['ds'].dt.tz_localize(None)
 
-    # Initialize Prophet model
-    # Optimization: uncertainty_samples=100 (default 1000) to speed up forecast by ~10x while keeping intervals
-    m = Prophet(
+    # Reuse the fitted model and forecast when the same data and params come back
+    params = dict(
         seasonality_mode=seasonality_mode,
         growth=growth,
         daily_seasonality=daily_seasonality,
         weekly_seasonality=weekly_seasonality,
         yearly_seasonality=yearly_seasonality,
-        holidays=holidays,
-        interval_width=0.95, # Increased for more conservative detection
-        uncertainty_samples=300 # More samples for more stable intervals
     )
-    
-    m.fit(df)
+    key = _data_key(df) + (days, include_intervals, _holidays_key(holidays)) + tuple(params.values())
+    with _FORECAST_CACHE_LOCK:
+        cached = _FORECAST_CACHE.get(key)
 
-    # Create future dataframe (includes history + future)
-    future = m.make_future_dataframe(periods=days)
+    if cached is None:
+        forecast, m = _fit_forecast(df, days, include_intervals, holidays=holidays, **params)
+        with _FORECAST_CACHE_LOCK:
+            _FORECAST_CACHE[key] = {'forecast': forecast, 'model': m}
+    else:
+        forecast, m = cached['forecast'], cached['model']
 
-    # Forecast
-    forecast = m.predict(future)
+    # Hand out a copy on both paths so callers cannot mutate the cached frame
+    forecast = forecast.copy()
 
     # Detect Anomalies (on historical data)
-    anomalies = detect_anomalies(forecast, df)
+    if include_intervals:
+        anomalies = detect_anomalies(forecast, df)
+    else:
+        anomalies = pd.DataFrame(columns=['ds', 'y', 'yhat', 'yhat_lower', 'yhat_upper', 'severity', 'severity_level'])
     
     # Calculate Metrics (on historical data)
-    # We need to get the fitted values for the history
-    history_forecast = forecast[forecast['ds'].isin(df['ds'])]
+    # The future frame is the model's unique history dates followed by the new
+    # dates, so the fitted history is a positional prefix of the forecast
+    history_forecast = forecast.iloc[:len(m.history_dates)]
     # Merge to ensure alignment
     metrics_df = pd.merge(df, history_forecast[['ds', 'yhat']], on='ds')
     metrics = calculate_metrics(metrics_df['y'].values, metrics_df['yhat'].values)
@@ -194,27 +367,60 @@ def generate_forecast(
     insights = generate_insights(forecast, anomalies, df)
 
     # Sort by date for alignment
-    forecast = forecast.sort_values('ds')
     anomalies = anomalies.sort_values('ds')
 
     return {
-        "forecast": forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
+        "forecast": forecast,
         "anomalies": anomalies,
         "metrics": metrics,
         "insights": insights,
         "model": m
     }
 
+def _forecast_without_model(df: pd.DataFrame, **kwargs) -> Dict:
+    # The fitted model is not needed by callers and is costly to pickle back from workers
+    result = generate_forecast(df, **kwargs)
+    result.pop("model")
+    return result
+
+def generate_multi_forecast(
+    df: pd.DataFrame,
+    target_cols: List[str],
+    n_jobs: int = MAX_PARALLEL_FITS,
+    **kwargs
+) -> Dict[str, Dict]:
+    """
+    Forecast each target column of a normalized multi-target frame independently.
+    Fits run in up to n_jobs worker processes; kwargs are passed to generate_forecast.
+    Returns generate_forecast's result dict, without the model, keyed by target column.
+    """
+    frames = [
+        df[['ds', c]].rename(columns={c: 'y'}).dropna(subset=['y'])
+        for c in target_cols
+    ]
+    if len(frames) == 1:
+        return {target_cols[0]: _forecast_without_model(frames[0], **kwargs)}
+
+    # Targets share no state, so each fit can run in its own process
+    results = Parallel(n_jobs=min(n_jobs, len(frames)), backend='loky')(
+        delayed(_forecast_without_model)(frame, **kwargs) for frame in frames
+    )
+    return dict(zip(target_cols, results))
+
 def generate_insights(forecast: pd.DataFrame, anomalies: pd.DataFrame, history: pd.DataFrame) -> Dict[str, List[str]]:
     """
     Generate natural language insights and recommendations based on forecast data.
     """
     insights = []
     recommendations = []
+
+    # Work on raw arrays; forecast is sorted by ds
+    ds = forecast['ds'].to_numpy()
+    yhat = forecast['yhat'].to_numpy()
     
     # Analyze the forecast trend
-    current_val = history['y'].iloc[-1]
-    future_val = forecast['yhat'].iloc[-1]
+    current_val = history['y'].to_numpy()[-1]
+    future_val = yhat[-1]
     trend_pct = ((future_val - current_val) / current_val) * 100
     
     direction = "growth" if trend_pct > 0 else "decline"
@@ -232,11 +438,12 @@ def generate_insights(forecast: pd.DataFrame, anomalies: pd.DataFrame, history:
         recommendations.append("<b>Cost Optimization</b>: Identify potential operational efficiencies to offset the projected decline.")
 
     # Look for significant peaks in the forecast
-    future_forecast = forecast[forecast['ds'] > history['ds'].max()]
-    if not future_forecast.empty:
-        peak_idx = future_forecast['yhat'].idxmax()
-        peak_time = future_forecast.loc[peak_idx, 'ds'].strftime('%Y-%m-%d')
-        peak_val = future_forecast.loc[peak_idx, 'yhat']
+    cut = np.searchsorted(ds, history['ds'].max().to_datetime64(), side='right')
+    future_yhat = yhat[cut:]
+    if future_yhat.size > 0:
+        peak_off = future_yhat.argmax()
+        peak_time = pd.Timestamp(ds[cut + peak_off]).strftime('%Y-%m-%d')
+        peak_val = future_yhat[peak_off]
         
         insights.append(f"<b>Forecast Peak</b>: The model projects a high of <b>{peak_val:.2f}</b> around <b>{peak_time}</b>.")
         recommendations.append(f"<b>Peak Readiness</b>: Plan marketing or maintenance activities around the <b>{peak_time}</b> peak.")
@@ -253,14 +460,14 @@ def generate_insights(forecast: pd.DataFrame, anomalies: pd.DataFrame, history:
     else:
         insights.append("<b>Operational Stability</b>: No significant anomalies detected in recent historical data.")
 
-    # Check prediction confidence
-    last_point = forecast.iloc[-1]
-    spread = (last_point['yhat_upper'] - last_point['yhat_lower']) / last_point['yhat'] * 100
-    if spread < 15:
-        insights.append("<b>High Confidence</b>: The model shows high convergence with a narrow prediction interval.")
-    else:
-        insights.append("<b>Variable Forecast</b>: Noted a wider uncertainty margin, suggesting potential external market influence.")
-        recommendations.append("<b>Data Refinement</b>: Consider adding additional context columns (holidays, promos) to reduce forecast variance.")
+    # Check prediction confidence (intervals are NaN when they were not requested)
+    spread = (forecast['yhat_upper'].to_numpy()[-1] - forecast['yhat_lower'].to_numpy()[-1]) / future_val * 100
+    if not np.isnan(spread):
+        if spread < 15:
+            insights.append("<b>High Confidence</b>: The model shows high convergence with a narrow prediction interval.")
+        else:
+            insights.append("<b>Variable Forecast</b>: Noted a wider uncertainty margin, suggesting potential external market influence.")
+            recommendations.append("<b>Data Refinement</b>: Consider adding additional context columns (holidays, promos) to reduce forecast variance.")
     
     return {
         "insights": insights,
@@ -1,23 +1,28 @@
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import io
 import pandas as pd
-from typing import Dict, List, Any
+from tempfile import SpooledTemporaryFile
+from typing import IO, Dict, List, Any
+
+# Reports smaller than this stay in memory, larger ones spill to a temp file
+PDF_SPOOL_MAX_SIZE = 1 << 20  # 1 MiB
 
 def generate_pdf_report(
     forecast_df: pd.DataFrame,
     metrics: Dict[str, float],
     insights_data: Dict[str, List[str]], # Changed from insights: List[str]
     anomalies: pd.DataFrame
-) -> io.BytesIO:
+) -> IO[bytes]:
     """
     Generates a professional executive report for business insights.
-    Returns: BytesIO object containing the PDF.
+    Returns: a file object positioned at the start of the PDF. The caller closes it.
     """
-    buffer = io.BytesIO()
+    # reportlab is only needed for /report, keep it out of worker start-up
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
+    buffer = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
@@ -94,14 +99,17 @@ def generate_pdf_report(
         anomaly_data = [["Priority", "Date", "Actual", "Forecast", "Variance %"]]
         top_anomalies = anomalies.sort_values(by='severity', ascending=False).head(10) # Top 10
         
-        for _, row in top_anomalies.iterrows():
-            date_str = pd.to_datetime(row['ds']).strftime('%Y-%m-%d')
-            var_pct = (row['severity'] / row['yhat']) * 100
+        # Format dates in one vectorized pass, then walk plain tuples
+        rows = top_anomalies[['severity_level', 'ds', 'y', 'yhat', 'severity']].assign(
+            ds=pd.to_datetime(top_anomalies['ds']).dt.strftime('%Y-%m-%d')
+        )
+        for severity_level, date_str, y, yhat, severity in rows.itertuples(index=False, name=None):
+            var_pct = (severity / yhat) * 100
             anomaly_data.append([
-                row['severity_level'],
+                severity_level,
                 date_str,
-                f"{row['y']:.1f}",
-                f"{row['yhat']:.1f}",
+                f"{y:.1f}",
+                f"{yhat:.1f}",
                 f"{var_pct:.1f}%"
             ])
             
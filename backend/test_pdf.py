@@ -24,7 +24,7 @@ def test_pdf_generation():
         buffer = generate_pdf_report(forecast_df, metrics, insights, anomalies)
         # Attempt to write to file to check it's valid
         with open("test_report.pdf", "wb") as f:
-            f.write(buffer.getvalue())
+            f.write(buffer.read())
         print("PDF generated successfully: test_report.pdf")
         os.remove("test_report.pdf")
     except Exception as e:
@@ -1,5 +1,10 @@
 import os
-from app.utils.forecasting import generate_forecast
+import numpy as np
+import pandas as pd
+from app.utils.forecasting import (
+    calculate_metrics, detect_anomalies, generate_forecast, generate_multi_forecast,
+    get_prophet_model, normalize_columns, normalize_multi_columns
+)
 import pytest
 
 def test_root_endpoint(client):
@@ -50,3 +55,197 @@ def test_advanced_parameters(client, sample_csv):
     assert response.status_code == 200
     data = response.json()
     assert data["parameters"]["seasonality_mode"] == "multiplicative"
+
+def test_prophet_model_cache_returns_fresh_instances():
+    first = get_prophet_model(seasonality_mode='additive', growth='linear')
+    second = get_prophet_model(seasonality_mode='additive', growth='linear')
+    assert first is not second
+    assert first.stan_backend is not second.stan_backend
+    assert first.history is None and second.history is None
+
+def test_detect_anomalies_severity_levels():
+    ds = pd.date_range('2023-01-01', periods=4)
+    forecast = pd.DataFrame({
+        'ds': ds,
+        'yhat': [100.0, 100.0, 100.0, 100.0],
+        'yhat_lower': [95.0, 95.0, 95.0, 95.0],
+        'yhat_upper': [105.0, 105.0, 105.0, 105.0],
+    })
+    actuals = pd.DataFrame({'ds': ds, 'y': [130.0, 88.0, 106.0, 100.0]})
+
+    anomalies = detect_anomalies(forecast, actuals)
+    assert list(anomalies['severity_level']) == ['High', 'Medium', 'Low']
+    assert list(anomalies['severity']) == [30.0, 12.0, 6.0]
+
+def test_parse_dates_keeps_sub_second_resolution():
+    from app.utils.forecasting import _parse_dates
+    parsed = _parse_dates(pd.Series(["2023-01-01 00:00:00.250", "2023-01-01 00:00:00.750"]))
+    assert parsed.is_unique
+    assert parsed.iloc[1] - parsed.iloc[0] == pd.Timedelta(milliseconds=500)
+
+def test_forecast_without_intervals(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        response = client.post(
+            "/forecast?days=5&intervals=false",
+            files={"file": ("test_sample.csv", f, "text/csv")}
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["anomalies"] == []
+    assert data["data"][0]["yhat"] is not None
+    assert data["data"][0]["yhat_lower"] is None
+
+def test_calculate_metrics_skips_nan_pairs():
+    y_true = np.array([1.0, 2.0, np.nan, 4.0])
+    y_pred = np.array([1.5, 2.0, 3.0, 3.0])
+    assert calculate_metrics(y_true, y_pred) == {"MAE": 0.5, "RMSE": 0.6455, "MAPE": 25.0}
+    assert calculate_metrics(np.array([np.nan]), np.array([1.0])) == {"MAE": 0.0, "RMSE": 0.0, "MAPE": 0.0}
+
+def test_calculate_metrics_mape_ignores_zero_actuals():
+    y_true = np.array([0.0, 2.0, -4.0])
+    y_pred = np.array([1.0, 1.0, -3.0])
+    # (0 + 0.5 + 0.25) / 3 rows, the zero actual contributes nothing
+    assert calculate_metrics(y_true, y_pred)["MAPE"] == 25.0
+    assert calculate_metrics(np.array([0.0, 0.0]), np.array([1.0, 2.0]))["MAPE"] == 0.0
+
+def test_report_upload_returns_pdf(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        response = client.post(
+            "/report?days=5",
+            files={"file": ("test_sample.csv", f, "text/csv")}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+
+def test_report_closes_pdf_file(client, sample_csv, monkeypatch):
+    import app.utils.reporting as reporting
+    opened = []
+    original = reporting.generate_pdf_report
+
+    def tracking_report(**kwargs):
+        pdf_file = original(**kwargs)
+        opened.append(pdf_file)
+        return pdf_file
+
+    monkeypatch.setattr(reporting, "generate_pdf_report", tracking_report)
+    with open(sample_csv, "rb") as f:
+        response = client.post("/report?days=5", files={"file": ("test_sample.csv", f, "text/csv")})
+    assert response.status_code == 200
+    assert opened and opened[0].closed
+
+def test_forecast_history_precedes_future():
+    df = pd.read_csv(os.path.join(os.path.dirname(__file__), "data", "sample_data.txt"))
+    result = generate_forecast(df.copy(), days=5)
+    forecast = result["forecast"]
+    history_ds = pd.to_datetime(df["ds"]).drop_duplicates().sort_values().reset_index(drop=True)
+    assert len(forecast) == len(history_ds) + 5
+    assert (forecast["ds"].iloc[:len(history_ds)].reset_index(drop=True) == history_ds).all()
+
+def test_forecast_reuses_cached_fit():
+    df = pd.read_csv(os.path.join(os.path.dirname(__file__), "data", "sample_data.txt"))
+    first = generate_forecast(df.copy(), days=7)
+    second = generate_forecast(df.copy(), days=7)
+    assert second["model"] is first["model"]
+    assert second["forecast"].equals(first["forecast"])
+
+    other = generate_forecast(df.copy(), days=8)
+    assert other["model"] is not first["model"]
+
+def test_forecast_cache_is_isolated_from_caller_mutation():
+    df = pd.read_csv(os.path.join(os.path.dirname(__file__), "data", "sample_data.txt"))
+    first = generate_forecast(df.copy(), days=9)
+    expected = first["forecast"]["yhat"].copy()
+    first["forecast"]["yhat"] = -1.0
+
+    second = generate_forecast(df.copy(), days=9)
+    assert second["forecast"]["yhat"].equals(expected)
+    second["forecast"]["yhat"] = -2.0
+    assert generate_forecast(df.copy(), days=9)["forecast"]["yhat"].equals(expected)
+
+def test_multi_forecast_upload(client):
+    rows = "\n".join(f"2023-01-{d:02d},{100 + d},{50 - d},store-{d}" for d in range(1, 15))
+    response = client.post(
+        "/forecast/multi?days=5",
+        files={"file": ("multi.csv", ("date,sales,returns,store\n" + rows).encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    targets = response.json()["targets"]
+    assert list(targets) == ["sales", "returns"]
+    assert len(targets["sales"]["data"]) == 14 + 5
+    assert "MAE" in targets["returns"]["metrics"]
+
+def test_prophet_model_cache_is_bounded():
+    from app.utils.forecasting import _PROPHET_CACHE
+    for i in range(_PROPHET_CACHE.maxsize + 5):
+        get_prophet_model(daily_seasonality=f"bogus-{i}")
+    assert len(_PROPHET_CACHE) <= _PROPHET_CACHE.maxsize
+
+def _post_forecast(client, content, days=3):
+    return client.post(
+        f"/forecast?days={days}",
+        files={"file": ("upload.csv", content.encode(), "text/csv")}
+    )
+
+def test_forecast_repeated_header(client):
+    rows = "\n".join(f"2023-01-{d:02d},{100 + d},{d}" for d in range(1, 11))
+    response = _post_forecast(client, "date,sales,sales\n" + rows)
+    assert response.status_code == 200
+    assert response.json()["row_count"] == 10
+
+def test_forecast_missing_trailing_fields(client):
+    rows = "\n".join(f"2023-01-{d:02d},{100 + d}" + (",promo" if d % 3 == 0 else "") for d in range(1, 11))
+    response = _post_forecast(client, "date,sales,note\n" + rows)
+    assert response.status_code == 200
+    assert response.json()["row_count"] == 10
+
+def test_forecast_keeps_local_wall_time_for_offsets(client):
+    rows = "\n".join(f"2023-01-{d:02d}T00:00:00+05:00,{100 + d}" for d in range(1, 11))
+    response = _post_forecast(client, "ds,y\n" + rows)
+    assert response.status_code == 200
+    assert response.json()["data"][0]["ds"] == "2023-01-01T00:00:00"
+
+def test_normalize_columns_rejects_duplicate_names():
+    df = pd.DataFrame([["2023-01-01", 1, 2]], columns=["date", "sales", "sales"])
+    with pytest.raises(ValueError, match="Duplicate column names: sales"):
+        normalize_columns(df)
+
+def test_generate_multi_forecast_drops_models():
+    raw = pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=14).strftime("%Y-%m-%d"),
+        "sales": [100.0 + d for d in range(14)],
+        "returns": [50.0 - d for d in range(14)],
+    })
+    df, targets = normalize_multi_columns(raw)
+    results = generate_multi_forecast(df, targets, n_jobs=2, days=3)
+    assert list(results) == ["sales", "returns"]
+    assert all("model" not in result for result in results.values())
+    assert len(results["returns"]["forecast"]) == 14 + 3
+
+def test_forecast_keeps_sub_second_timestamps(client):
+    rows = "\n".join(f"2023-01-01T00:00:{i // 2:02d}.{5 * (i % 2)},{100 + i}" for i in range(20))
+    response = _post_forecast(client, "ds,y\n" + rows, days=1)
+    assert response.status_code == 200
+    ds = [point["ds"] for point in response.json()["data"][:3]]
+    assert ds == ["2023-01-01T00:00:00", "2023-01-01T00:00:00.500000", "2023-01-01T00:00:01"]
+
+def test_normalize_columns_skips_all_nan_numeric_column():
+    df = pd.DataFrame({"date": ["2023-01-01", "2023-01-02"], "empty": [np.nan, np.nan], "units": [3, 4]})
+    assert normalize_columns(df)["y"].tolist() == [3, 4]
+
+def test_normalize_columns_finds_target_data_in_tail_sample():
+    n = 12_000
+    late = np.full(n, np.nan)
+    late[-5:] = 1.0
+    df = pd.DataFrame({"date": pd.date_range("2000-01-01", periods=n), "late": late, "units": np.arange(n)})
+    assert normalize_columns(df)["y"].notna().sum() == 5
+
+def test_normalize_columns_prefers_earlier_candidates():
+    df = pd.DataFrame([["08:00", "2023-01-01", 9.5, 7]], columns=["Time", "Date", "price", "sales"])
+    out = normalize_columns(df)
+    assert out["ds"].tolist() == ["2023-01-01"]
+    assert out["y"].tolist() == [7]
+
+def test_normalize_columns_first_column_wins_case_collisions():
+    df = pd.DataFrame([["2023-01-01", "2024-06-30", 5]], columns=["Date", "date", "sales"])
+    assert normalize_columns(df)["ds"].tolist() == ["2023-01-01"]